@@ -1,11 +1,23 @@
 import streamlit as st
 import pandas as pd
 from pathlib import Path
+import sys
 
 st.set_page_config(page_title="Xylanase Dashboard", layout="wide")
 
 ROOT = Path(__file__).resolve().parents[1]
-METADATA_DIR = ROOT / 'results' / 'metadata'
+METADATA_DIR = ROOT / 'xylanase_pipeline' / 'results' / 'metadata'
+AGGREGATES_PATH = ROOT / 'xylanase_pipeline' / 'results' / 'aggregates' / 'xylanase_aggregates.json.gz'
+
+# Reuse the pipeline's loader so the aggregates format is defined in one place
+sys.path.insert(0, str(ROOT / 'xylanase_pipeline'))
+from aggregation.aggregation import load_aggregates
+
+
+@st.cache_data
+def cached_aggregates(path, mtime):
+    """Load precomputed views; mtime is part of the cache key so regenerated files are picked up."""
+    return load_aggregates(path)
 
 st.title("Xylanase Sequences — Dashboard")
 st.markdown("This dashboard loads metadata CSVs from the repository and provides interactive filtering and download.")
@@ -50,5 +62,77 @@ st.dataframe(filtered)
 csv_bytes = filtered.to_csv(index=False).encode('utf-8')
 st.download_button('Download filtered CSV', data=csv_bytes, file_name='filtered_metadata.csv', mime='text/csv')
 
+st.markdown("---")
+st.header("Feature distributions")
+
+if AGGREGATES_PATH.exists():
+    aggregates, info = cached_aggregates(str(AGGREGATES_PATH), AGGREGATES_PATH.stat().st_mtime)
+    hist = aggregates['histograms']
+    quant = aggregates['quantiles']
+    proj = aggregates['projection']
+
+    col1, col2, col3 = st.columns(3)
+    feature = col1.selectbox('Feature', info.get('features', sorted(hist['Feature'].unique())))
+    taxa = col2.multiselect('Taxon', sorted(hist['Taxon'].unique()))
+    thermo = col3.multiselect('Thermo class', sorted(hist['Thermo_Class'].unique()))
+
+    # Histogram counts share bin edges per feature, so selections are summed
+    h = hist[hist['Feature'] == feature]
+    if taxa:
+        h = h[h['Taxon'].isin(taxa)]
+    if thermo:
+        h = h[h['Thermo_Class'].isin(thermo)]
+    h = h.groupby(['Bin_Left', 'Bin_Right', 'Taxon'], as_index=False)['Count'].sum()
+    st.vega_lite_chart(h, {
+        'mark': {'type': 'bar', 'opacity': 0.7},
+        'encoding': {
+            'x': {'field': 'Bin_Left', 'type': 'quantitative', 'bin': {'binned': True}, 'title': feature},
+            'x2': {'field': 'Bin_Right'},
+            'y': {'field': 'Count', 'type': 'quantitative', 'stack': None},
+            'color': {'field': 'Taxon', 'type': 'nominal'},
+        },
+    }, use_container_width=True)
+
+    q = quant[quant['Feature'] == feature]
+    if taxa:
+        q = q[q['Taxon'].isin(taxa)]
+    if thermo:
+        q = q[q['Thermo_Class'].isin(thermo)]
+    st.dataframe(q.drop(columns=['Feature']))
+
+    st.header("Sequence projection")
+    method = info.get('projection', {}).get('method', 'pca').upper()
+    explained = info.get('projection', {}).get('explained_variance')
+    caption = f"{method} of standardized features — {len(proj)} of {info.get('n_sequences', len(proj))} sequences shown"
+    if explained:
+        caption += f" (PC1 {explained[0]:.0%}, PC2 {explained[1]:.0%} variance)"
+    st.caption(caption)
+    p = proj
+    if taxa:
+        p = p[p['Taxon'].isin(taxa)]
+    if thermo:
+        p = p[p['Thermo_Class'].isin(thermo)]
+    color_by = st.radio('Color by', ['Taxon', 'Thermo_Class'], horizontal=True)
+    st.vega_lite_chart(p, {
+        'mark': {'type': 'circle', 'size': 30, 'opacity': 0.7},
+        'encoding': {
+            'x': {'field': 'X', 'type': 'quantitative'},
+            'y': {'field': 'Y', 'type': 'quantitative'},
+            'color': {'field': color_by, 'type': 'nominal'},
+            'tooltip': [{'field': 'Accession'}, {'field': 'Organism'}, {'field': 'Thermo_Class'}],
+        },
+    }, use_container_width=True)
+
+    st.header("Top organisms")
+    orgs = aggregates['organism_counts']
+    if taxa:
+        orgs = orgs[orgs['Taxon'].isin(taxa)]
+    if thermo:
+        orgs = orgs[orgs['Thermo_Class'].isin(thermo)]
+    orgs = orgs.groupby('Organism', as_index=False)['Count'].sum().nlargest(20, 'Count')
+    st.bar_chart(orgs.set_index('Organism')['Count'])
+else:
+    st.info("No precomputed aggregates found. Run `python xylanase_pipeline/run_pipeline.py` to generate them.")
+
 st.markdown("---")
 st.markdown("Run locally: `streamlit run dashboard/streamlit_app.py`\n\nDeploy: use Streamlit Cloud or Render to host the app.")
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Pipeline modules import each other relative to xylanase_pipeline/ (see run_pipeline.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "xylanase_pipeline"))
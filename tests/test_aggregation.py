@@ -0,0 +1,48 @@
+# tests/test_aggregation.py
+import pandas as pd
+import pytest
+
+from aggregation.aggregation import build_aggregates, compute_projection, downsample
+
+def _frame(groups, per_group, n_features=3):
+    """Toy feature table: `groups` Thermo_Class values x `per_group` rows each."""
+    rows = []
+    for g in range(groups):
+        for i in range(per_group):
+            row = {'Accession': f"A{g:03d}{i:04d}", 'Organism': f"Org{g}",
+                   'Taxon': 'Fungal', 'Thermo_Class': f"C{g}"}
+            row.update({f"f{k}": float(g * 10 + i + k) for k in range(n_features)})
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+@pytest.mark.parametrize("groups,per_group,max_points", [(50, 2, 20), (50, 4, 60), (3, 100, 99), (5, 37, 100)])
+def test_downsample_respects_cap(groups, per_group, max_points):
+    sample = downsample(_frame(groups, per_group), max_points=max_points)
+    assert len(sample) == max_points
+
+def test_downsample_keeps_one_point_per_group_when_possible():
+    df = pd.concat([_frame(1, 500), _frame(10, 1).assign(Thermo_Class=lambda d: "R" + d['Thermo_Class'])])
+    sample = downsample(df, max_points=50)
+    assert len(sample) <= 50
+    assert sample.groupby(['Taxon', 'Thermo_Class']).ngroups == 11
+
+def test_downsample_is_deterministic_and_noop_under_cap():
+    df = _frame(4, 30)
+    assert downsample(df, max_points=50).equals(downsample(df, max_points=50))
+    assert len(downsample(df, max_points=1000)) == len(df)
+
+@pytest.mark.parametrize("rows,n_features", [(1, 3), (3, 1), (2, 2)])
+def test_compute_projection_tiny_inputs(rows, n_features):
+    df = _frame(1, rows, n_features=n_features)
+    features = [f"f{k}" for k in range(n_features)]
+    proj, info = compute_projection(df, features)
+    assert list(proj[['X', 'Y']].shape) == [rows, 2]
+    assert len(info['explained_variance']) == 2
+
+def test_build_aggregates_projects_downsampled_rows():
+    df = _frame(4, 50)
+    aggregates, info = build_aggregates(df, max_points=40)
+    assert len(aggregates['projection']) == 40
+    assert info['n_sequences'] == 200
+    # Histograms still cover every row, not just the sample
+    assert aggregates['histograms'].query("Feature == 'f0'")['Count'].sum() == 200
@@ -0,0 +1,100 @@
+# tests/test_sharding.py
+import os
+
+import pandas as pd
+import pytest
+
+from sharding.sharding import (
+    collect_shard_outputs, find_shard_dirs, merge_tables, retrieval_units, select_sequences,
+    select_units, shard_dir_name, shard_for_accession, write_manifest
+)
+
+ACCESSIONS = [f"P{i:05d}" for i in range(300)]
+SEQUENCES = [(f"{acc} | Xylanase | Org", "MKV") for acc in ACCESSIONS]
+
+def _write_shards(root, num_shards, indices=None, step="features"):
+    dirs = []
+    for i in (range(num_shards) if indices is None else indices):
+        d = os.path.join(root, shard_dir_name(i, num_shards))
+        write_manifest(d, step, num_shards, i, {})
+        dirs.append(d)
+    return dirs
+
+def test_shard_for_accession_is_stable():
+    # crc32 is process-independent, unlike the builtin hash()
+    assert shard_for_accession("P12345", 8) == shard_for_accession("P12345", 8)
+    assert shard_for_accession("P12345", 1) == 0
+
+@pytest.mark.parametrize("num_shards", [1, 3, 7])
+def test_select_sequences_is_disjoint_cover(num_shards):
+    shards = [select_sequences(SEQUENCES, num_shards, i) for i in range(num_shards)]
+    seen = [h for shard in shards for h, _ in shard]
+    assert sorted(seen) == sorted(h for h, _ in SEQUENCES)
+    assert len(seen) == len(set(seen))
+
+def test_select_sequences_rejects_bad_shard():
+    with pytest.raises(ValueError):
+        select_sequences(SEQUENCES, 2, 2)
+
+def test_retrieval_units_and_select_units():
+    units = retrieval_units({"Fungal": 4751, "Bacterial": 2}, {"Fungal": [4890, 5204]})
+    assert [u['unit_id'] for u in units] == ['fungal-4890', 'fungal-5204', 'fungal-rest', 'bacterial-2']
+    assert units[2]['clause'] == "(taxonomy_id:4751 NOT taxonomy_id:4890 NOT taxonomy_id:5204)"
+    for num_shards in (1, 3, 6):
+        picked = [u['unit_id'] for i in range(num_shards) for u in select_units(units, num_shards, i)]
+        assert sorted(picked) == sorted(u['unit_id'] for u in units)
+    # More shards than units leaves the extra shards empty
+    assert select_units(units, 6, 5) == []
+
+def test_find_shard_dirs_orders_by_index(tmp_path):
+    dirs = _write_shards(str(tmp_path), 3, indices=[2, 0, 1])
+    assert find_shard_dirs(str(tmp_path), "features") == sorted(dirs)
+
+def test_find_shard_dirs_missing_index(tmp_path):
+    _write_shards(str(tmp_path), 3, indices=[0, 2])
+    with pytest.raises(FileNotFoundError, match=r"\[1\]"):
+        find_shard_dirs(str(tmp_path), "features")
+
+def test_find_shard_dirs_duplicate_index(tmp_path):
+    _write_shards(str(tmp_path), 2)
+    write_manifest(str(tmp_path / "custom"), "features", 2, 1, {})
+    with pytest.raises(ValueError, match="reported by both"):
+        find_shard_dirs(str(tmp_path), "features")
+
+def test_find_shard_dirs_mixed_shard_counts(tmp_path):
+    _write_shards(str(tmp_path), 2)
+    old = _write_shards(str(tmp_path), 3)
+    with pytest.raises(ValueError, match="disagree"):
+        find_shard_dirs(str(tmp_path), "features")
+    # An explicit shard count ignores directories from other runs
+    assert find_shard_dirs(str(tmp_path), "features", num_shards=3) == old
+
+def test_collect_shard_outputs_checks_counts(tmp_path):
+    d = os.path.join(str(tmp_path), shard_dir_name(0, 1))
+    os.makedirs(os.path.join(d, "features"))
+    pd.DataFrame({'Accession': ["P1", "P2"]}).to_csv(os.path.join(d, "features", "fungal_xylanase_features.csv"), index=False)
+    items = {'fungal': {'taxon': 'fungal', 'fasta_total': 2, 'input': 2, 'output': 2}}
+    write_manifest(d, "features", 1, 0, items)
+    assert len(collect_shard_outputs([d], "features", "fungal")) == 1
+    # Stale or partial CSV: row count no longer matches the manifest
+    items['fungal']['output'] = 3
+    write_manifest(d, "features", 1, 0, items)
+    with pytest.raises(ValueError, match="manifest lists 3"):
+        collect_shard_outputs([d], "features", "fungal")
+    # Shard inputs must add up to the FASTA the shards read
+    items['fungal'].update(output=2, input=1)
+    write_manifest(d, "features", 1, 0, items)
+    with pytest.raises(ValueError, match="add up"):
+        collect_shard_outputs([d], "features", "fungal")
+
+def test_merge_tables_dedups_and_is_order_independent(tmp_path):
+    a = pd.DataFrame({'Accession': ["P3", "P1", "P2"], 'v': [3, 1, 2]})
+    b = pd.DataFrame({'Accession': ["P2", "P4"], 'v': [2, 4]})
+    paths = []
+    for name, df in (("a.csv", a), ("b.csv", b)):
+        paths.append(str(tmp_path / name))
+        df.to_csv(paths[-1], index=False)
+    merged = merge_tables(paths)
+    assert merged['Accession'].tolist() == ["P1", "P2", "P3", "P4"]
+    assert merged.equals(merge_tables(paths[::-1]))
+    assert merge_tables([]).empty
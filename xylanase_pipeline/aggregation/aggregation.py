@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed aggregates for the dashboard
+Created on Mon Oct 19 2026
+@author: Bada Kanmi
+"""
+# xylanase_pipeline/aggregation/aggregation.py
+import pandas as pd
+import numpy as np
+import os
+import json
+import gzip
+
+# Columns written by extract_features that are identifiers, not numeric features
+ID_COLUMNS = ['Accession', 'Protein_Name', 'Organism', 'Sequence']
+# Large string columns that no aggregate uses; skipped when reading
+UNUSED_COLUMNS = ['Protein_Name', 'Sequence']
+GROUP_COLUMNS = ['Taxon', 'Thermo_Class']
+ALL_LABEL = 'All'
+QUANTILES = [0.0, 0.05, 0.25, 0.5, 0.75, 0.95, 1.0]
+
+def load_feature_tables(features_dir, metadata_dir, taxa=("fungal", "bacterial")):
+    """Load per-taxon feature CSVs and attach Taxon + Thermo_Class from metadata."""
+    frames = []
+    for taxon in taxa:
+        features_path = os.path.join(features_dir, f"{taxon}_xylanase_features.csv")
+        if not os.path.exists(features_path):
+            print(f"[WARN] Features missing for {taxon}: {features_path}")
+            continue
+        df = pd.read_csv(features_path, usecols=lambda c: c not in UNUSED_COLUMNS)
+        df['Taxon'] = taxon.capitalize()
+        # Thermo_Class lives in the retrieval metadata; join on Accession
+        metadata_path = os.path.join(metadata_dir, f"{taxon}_xylanase_sequences_metadata.csv")
+        if os.path.exists(metadata_path):
+            meta = pd.read_csv(metadata_path, usecols=lambda c: c in ('Accession', 'Thermo_Class'))
+            if 'Thermo_Class' in meta.columns:
+                meta = meta.drop_duplicates(subset=['Accession'])
+                df = df.merge(meta, on='Accession', how='left')
+        if 'Thermo_Class' not in df.columns:
+            df['Thermo_Class'] = None
+        df['Thermo_Class'] = df['Thermo_Class'].fillna('Unknown').astype(str)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    print(f"[INFO] Loaded {len(df)} feature vectors for aggregation.")
+    return df
+
+def feature_columns(df):
+    """Return the numeric feature columns (everything except identifiers/groups)."""
+    skip = set(ID_COLUMNS + GROUP_COLUMNS)
+    return [c for c in df.columns if c not in skip and pd.api.types.is_numeric_dtype(df[c])]
+
+def compute_histograms(df, features, bins=30):
+    """Histogram counts per feature x Taxon x Thermo_Class on shared bin edges.
+
+    Edges are fixed per feature across all groups, so counts stay additive:
+    the dashboard sums rows to combine any selection of groups.
+    """
+    rows = []
+    for feat in features:
+        values = df[feat].dropna()
+        if values.empty:
+            continue
+        lo, hi = float(values.min()), float(values.max())
+        if lo == hi:
+            hi = lo + 1.0
+        edges = np.linspace(lo, hi, bins + 1)
+        for (taxon, thermo), group in df.groupby(GROUP_COLUMNS, observed=True):
+            counts, _ = np.histogram(group[feat].dropna(), bins=edges)
+            for i, count in enumerate(counts):
+                if count == 0:
+                    continue
+                rows.append({
+                    'Feature': feat, 'Taxon': taxon, 'Thermo_Class': thermo,
+                    'Bin_Left': edges[i], 'Bin_Right': edges[i + 1], 'Count': int(count)
+                })
+    return pd.DataFrame(rows, columns=['Feature'] + GROUP_COLUMNS + ['Bin_Left', 'Bin_Right', 'Count'])
+
+def _group_rollups(df):
+    """Yield (taxon, thermo_class, subframe) for every cell plus 'All' rollups."""
+    yield ALL_LABEL, ALL_LABEL, df
+    for taxon, group in df.groupby('Taxon'):
+        yield taxon, ALL_LABEL, group
+    for thermo, group in df.groupby('Thermo_Class'):
+        yield ALL_LABEL, thermo, group
+    for (taxon, thermo), group in df.groupby(GROUP_COLUMNS):
+        yield taxon, thermo, group
+
+def compute_quantiles(df, features, quantiles=QUANTILES):
+    """Quantiles per feature x Taxon x Thermo_Class, including 'All' rollups.
+
+    Quantiles are not additive, so rollups are precomputed here rather than
+    merged in the dashboard.
+    """
+    q_cols = [f"q{int(q * 100):02d}" for q in quantiles]
+    rows = []
+    for taxon, thermo, group in _group_rollups(df):
+        qs = group[features].quantile(quantiles)
+        means = group[features].mean()
+        counts = group[features].count()
+        for feat in features:
+            row = {'Feature': feat, 'Taxon': taxon, 'Thermo_Class': thermo,
+                   'N': int(counts[feat]), 'Mean': means[feat]}
+            row.update(dict(zip(q_cols, qs[feat].tolist())))
+            rows.append(row)
+    return pd.DataFrame(rows, columns=['Feature'] + GROUP_COLUMNS + ['N', 'Mean'] + q_cols)
+
+def compute_organism_counts(df):
+    """Sequence counts per Organism x Taxon x Thermo_Class."""
+    counts = df.groupby(['Organism'] + GROUP_COLUMNS).size().reset_index(name='Count')
+    return counts.sort_values('Count', ascending=False, kind='mergesort').reset_index(drop=True)
+
+def compute_projection(df, features, method="pca", random_state=0):
+    """2-D projection of standardized features (PCA via SVD; UMAP if installed)."""
+    X = df[features].fillna(df[features].median()).to_numpy(dtype=float)
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    X = (X - X.mean(axis=0)) / std
+    explained = None
+    if method == "umap" and len(df) <= 15:
+        # UMAP's default neighbourhood needs more points than this
+        print("[WARN] Too few sequences for UMAP; falling back to PCA.")
+        method = "pca"
+    if method == "umap":
+        try:
+            import umap  # Optional dependency
+            coords = umap.UMAP(n_components=2, random_state=random_state).fit_transform(X)
+        except ImportError:
+            print("[WARN] umap-learn not installed; falling back to PCA.")
+            method = "pca"
+    if method == "pca":
+        _, s, vt = np.linalg.svd(X, full_matrices=False)
+        coords = X @ vt[:2].T
+        variance = s ** 2
+        explained = (variance[:2] / variance.sum()).tolist() if variance.sum() > 0 else [0.0, 0.0]
+        # Fewer than 2 rows or features gives fewer than 2 components; pad with zeros
+        if coords.shape[1] < 2:
+            coords = np.hstack([coords, np.zeros((len(coords), 2 - coords.shape[1]))])
+            explained = (explained + [0.0, 0.0])[:2]
+    proj = pd.DataFrame({
+        'Accession': df['Accession'].values,
+        'Organism': df['Organism'].values,
+        'Taxon': df['Taxon'].values,
+        'Thermo_Class': df['Thermo_Class'].values,
+        'X': coords[:, 0],
+        'Y': coords[:, 1],
+    })
+    return proj, {'method': method, 'explained_variance': explained}
+
+def downsample(df, max_points=5000, random_state=0):
+    """Stratified downsample by Taxon x Thermo_Class, capped at max_points total."""
+    if len(df) <= max_points:
+        return df.reset_index(drop=True)
+    frac = max_points / len(df)
+    groups = [group for _, group in df.groupby(GROUP_COLUMNS)]
+    # Keep at least one point per group so rare classes stay visible
+    quotas = [len(group) * frac for group in groups]
+    sizes = [max(1, int(q)) for q in quotas]
+    # Hand out the remaining points by largest fractional remainder
+    order = sorted(range(len(groups)), key=lambda i: quotas[i] - int(quotas[i]), reverse=True)
+    for i in order:
+        if sum(sizes) >= max_points:
+            break
+        if sizes[i] < len(groups[i]):
+            sizes[i] += 1
+    # The per-group floor can overshoot; take the excess from the largest groups
+    excess = sum(sizes) - max_points
+    while excess > 0 and max(sizes) > 1:
+        i = sizes.index(max(sizes))
+        sizes[i] -= 1
+        excess -= 1
+    parts = [group.sample(n=n, random_state=random_state) for group, n in zip(groups, sizes)]
+    sample = pd.concat(parts)
+    if len(sample) > max_points:
+        # More groups than max_points: not every group can keep a point
+        sample = sample.sample(n=max_points, random_state=random_state)
+    return sample.sort_index().reset_index(drop=True)
+
+def build_aggregates(df, bins=30, max_points=5000, method="pca", random_state=0):
+    """Main: Build all dashboard views from the joined feature table."""
+    features = feature_columns(df)
+    # Project only the downsampled rows so PCA/UMAP cost stays bounded by max_points
+    sample = downsample(df, max_points=max_points, random_state=random_state)
+    proj, proj_info = compute_projection(sample, features, method=method, random_state=random_state)
+    aggregates = {
+        'histograms': compute_histograms(df, features, bins=bins),
+        'quantiles': compute_quantiles(df, features),
+        'organism_counts': compute_organism_counts(df),
+        'projection': proj,
+    }
+    info = {
+        'n_sequences': int(len(df)),
+        'features': features,
+        'projection': proj_info,
+    }
+    print(f"[INFO] Built aggregates over {len(df)} sequences and {len(features)} features.")
+    return aggregates, info
+
+def save_aggregates(aggregates, info, output_dir="../results/aggregates", prefix="xylanase_aggregates"):
+    """Save all views to a single gzipped JSON file in output_dir."""
+    os.makedirs(output_dir, exist_ok=True)
+    out_path = f"{output_dir}/{prefix}.json.gz"
+    payload = {'info': info}
+    for name, table in aggregates.items():
+        payload[name] = json.loads(table.to_json(orient='split', index=False, double_precision=6))
+    with gzip.open(out_path, 'wt', encoding='utf-8') as f:
+        json.dump(payload, f, separators=(',', ':'))
+    print(f"[INFO] Aggregates saved to {out_path}.")
+    return out_path
+
+def load_aggregates(path):
+    """Load a saved aggregates file back into (dict of DataFrames, info)."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        payload = json.load(f)
+    info = payload.pop('info', {})
+    aggregates = {name: pd.DataFrame(**table) for name, table in payload.items()}
+    return aggregates, info
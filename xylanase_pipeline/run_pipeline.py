@@ -7,72 +7,213 @@ Created on Thu Nov 14 2025
 import sys
 import os
 import time  # For timing runs
+import argparse
 import importlib.util  # For dynamic imports
 
 # Add project root to path for local imports
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
+# Single canonical results root for sharded and unsharded runs
+RESULTS_DIR = os.path.join(project_root, "results")
+SHARDS_ROOT = os.path.join(RESULTS_DIR, "shards")
+TAXA = ["fungal", "bacterial"]
+
+def _load_module(name, relative_path):
+    """Dynamically import a pipeline module from a path under project_root."""
+    module_path = os.path.join(project_root, relative_path)
+    if not os.path.exists(module_path):
+        raise FileNotFoundError(f"{relative_path} not found at {module_path}.")
+    spec = importlib.util.spec_from_file_location(name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
 def run_retrieval():
     """Run the sequence retrieval pipeline."""
     print("\n[PIPELINE] Starting retrieval...")
     start_time = time.time()
-    
+
     # Dynamic import for sequence_retrieval.main
-    seq_retrieval_path = os.path.join(project_root, 'sequence_retrieval', 'main.py')
-    if not os.path.exists(seq_retrieval_path):
-        raise FileNotFoundError(f"sequence_retrieval/main.py not found at {seq_retrieval_path}. Check structure.")
-    
-    spec = importlib.util.spec_from_file_location("sequence_retrieval.main", seq_retrieval_path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    module.main()  # Call the main function
-    
+    module = _load_module("sequence_retrieval.main", os.path.join('sequence_retrieval', 'main.py'))
+    module.main(output_dir=RESULTS_DIR)  # Call the main function
+
     elapsed = time.time() - start_time
     print(f"[PIPELINE] Retrieval completed in {elapsed/60:.1f} minutes.")
 
-def run_feature_extraction():
-    """Run feature extraction on generated FASTAs."""
+def run_retrieval_shard(num_shards, shard_index, shard_dir):
+    """Run one retrieval shard (a disjoint set of taxonomy subtrees) into shard_dir."""
+    print(f"\n[PIPELINE] Starting retrieval shard {shard_index + 1}/{num_shards}...")
+    start_time = time.time()
+    module = _load_module("sequence_retrieval.main", os.path.join('sequence_retrieval', 'main.py'))
+    module.main_shard(num_shards, shard_index, shard_dir)
+    elapsed = time.time() - start_time
+    print(f"[PIPELINE] Retrieval shard completed in {elapsed/60:.1f} minutes.")
+
+def run_feature_extraction(num_shards=None, shard_index=None, shard_dir=None):
+    """Run feature extraction on generated FASTAs.
+
+    With num_shards set, only sequences whose accession hashes to shard_index
+    are featurized into shard_dir/features, and a shard manifest with per-taxon
+    input/output counts is written. A missing FASTA is then an error rather
+    than a warning, so merge never mixes fresh and stale taxa.
+    """
     print("\n[PIPELINE] Starting feature extraction...")
     start_time = time.time()
-    
+
     # Dynamic import for feature_extraction
-    feat_ext_path = os.path.join(project_root, 'feature_extraction', 'feature_extraction.py')
-    if not os.path.exists(feat_ext_path):
-        raise FileNotFoundError(f"feature_extraction/feature_extraction.py not found at {feat_ext_path}.")
-    
-    spec = importlib.util.spec_from_file_location("feature_extraction", feat_ext_path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
+    module = _load_module("feature_extraction", os.path.join('feature_extraction', 'feature_extraction.py'))
     load_fasta = module.load_fasta
     extract_features = module.extract_features
     save_features = module.save_features
-    
-    fasta_dir = os.path.join(project_root, "results", "fasta")
-    features_dir = os.path.join(project_root, "results", "features")
+
+    fasta_dir = os.path.join(RESULTS_DIR, "fasta")
+    sharding = None
+    if num_shards is not None:
+        sharding = _load_module("sharding", os.path.join('sharding', 'sharding.py'))
+        # Clear any previous run so merge never sees stale CSVs or manifests
+        sharding.reset_shard(shard_dir, "features")
+        features_dir = os.path.join(shard_dir, "features")
+    else:
+        features_dir = os.path.join(RESULTS_DIR, "features")
     os.makedirs(features_dir, exist_ok=True)
-    
+
     print(f"[DEBUG] Looking for FASTAs in {fasta_dir}")
-    
-    taxa = ["fungal", "bacterial"]
-    for taxon in taxa:
+
+    items = {}
+    for taxon in TAXA:
         fasta_path = os.path.join(fasta_dir, f"{taxon}_xylanase_sequences.fasta")
         print(f"[DEBUG] Checking {fasta_path}")
         if os.path.exists(fasta_path):
             print(f"[PIPELINE] Extracting features for {taxon}...")
             sequences = load_fasta(fasta_path)
+            if sharding is not None:
+                fasta_total = len(sequences)
+                sequences = sharding.select_sequences(sequences, num_shards, shard_index)
+                items[taxon] = {'taxon': taxon, 'fasta_total': fasta_total, 'input': len(sequences), 'output': 0}
+                print(f"[PIPELINE] Shard {shard_index + 1}/{num_shards}: {len(sequences)} {taxon} sequences.")
+                if not sequences:
+                    continue
             df_features = extract_features(sequences)
             save_path = save_features(df_features, features_dir, prefix=f"{taxon}_xylanase_features")
+            if sharding is not None:
+                items[taxon]['output'] = len(df_features)
             print(f"[PIPELINE] {taxon.capitalize()} features saved: {save_path}")
+        elif sharding is not None:
+            raise FileNotFoundError(f"FASTA missing for {taxon}: {fasta_path}. Run 'merge --step retrieval' first.")
         else:
             print(f"[WARN] FASTA missing for {taxon}: {fasta_path}")
-    
+
+    if sharding is not None:
+        sharding.write_manifest(shard_dir, "features", num_shards, shard_index, items)
+
     elapsed = time.time() - start_time
     print(f"[PIPELINE] Feature extraction completed in {elapsed:.1f} seconds.")
 
-if __name__ == "__main__":
-    print(f"[PIPELINE START] Full Xylanase Pipeline — {time.strftime('%Y-%m-%d %H:%M:%S')}")
-    run_retrieval()  # Step 1: Fetch sequences
-    run_feature_extraction()  # Step 2: Extract features
-    print(f"[PIPELINE DONE] All steps complete. Check 'results/' for outputs.")
+def _remove_canonical(step, taxon):
+    """Delete a taxon's canonical outputs for step so no stale file survives a merge."""
+    if step == "retrieval":
+        paths = [os.path.join(RESULTS_DIR, "metadata", f"{taxon}_xylanase_sequences_metadata.csv"),
+                 os.path.join(RESULTS_DIR, "fasta", f"{taxon}_xylanase_sequences.fasta")]
+    else:
+        paths = [os.path.join(RESULTS_DIR, "features", f"{taxon}_xylanase_features.csv")]
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"[WARN] Removed stale {path}")
+
+def run_merge(step, shards_root=SHARDS_ROOT, num_shards=None):
+    """Merge completed shard outputs for a step into the canonical results/ files.
+
+    Rows are deduplicated on Accession and sorted by it, so the result does not
+    depend on the number of shards or the order in which they finished.
+    Retrieval keeps the first TAXON_SIZE accessions per taxon, matching the
+    unsharded per-taxon cap. A taxon with no rows in any shard has its
+    canonical files removed rather than left stale.
+    """
+    print(f"\n[PIPELINE] Merging '{step}' shards from {shards_root}...")
+    sharding = _load_module("sharding", os.path.join('sharding', 'sharding.py'))
+    shard_dirs = sharding.find_shard_dirs(shards_root, step, num_shards)
+    if step == "retrieval":
+        retrieval = _load_module("sequence_retrieval.sequence_retrieval", os.path.join('sequence_retrieval', 'sequence_retrieval.py'))
+        taxon_size = _load_module("sequence_retrieval.main", os.path.join('sequence_retrieval', 'main.py')).TAXON_SIZE
+    else:
+        features = _load_module("feature_extraction", os.path.join('feature_extraction', 'feature_extraction.py'))
+
+    for taxon in TAXA:
+        paths = sharding.collect_shard_outputs(shard_dirs, step, taxon)
+        df = sharding.merge_tables(paths)
+        if len(df) == 0:
+            print(f"[WARN] No {step} rows for {taxon} in any shard.")
+            _remove_canonical(step, taxon)
+            continue
+        if step == "retrieval":
+            if len(df) > taxon_size:
+                print(f"[INFO] Keeping first {taxon_size} of {len(df)} {taxon} entries by accession.")
+                df = df.head(taxon_size)
+            retrieval.save_outputs(df, prefix=f"{taxon}_xylanase_sequences", output_dir=RESULTS_DIR)
+        else:
+            features.save_features(df, os.path.join(RESULTS_DIR, "features"), prefix=f"{taxon}_xylanase_features")
+        print(f"[PIPELINE] Merged {len(df)} {taxon} rows from {len(paths)} shard files.")
+
+def run_aggregation():
+    """Precompute dashboard aggregates from the extracted features."""
+    print("\n[PIPELINE] Starting aggregation...")
+    start_time = time.time()
 
+    # Dynamic import for aggregation
+    module = _load_module("aggregation", os.path.join('aggregation', 'aggregation.py'))
+
+    features_dir = os.path.join(RESULTS_DIR, "features")
+    metadata_dir = os.path.join(RESULTS_DIR, "metadata")
+    aggregates_dir = os.path.join(RESULTS_DIR, "aggregates")
+
+    df = module.load_feature_tables(features_dir, metadata_dir)
+    if len(df) == 0:
+        print("[WARN] No feature tables found; aggregation skipped.")
+        return
+    aggregates, info = module.build_aggregates(df)
+    save_path = module.save_aggregates(aggregates, info, aggregates_dir)
+    print(f"[PIPELINE] Aggregates saved: {save_path}")
+
+    elapsed = time.time() - start_time
+    print(f"[PIPELINE] Aggregation completed in {elapsed:.1f} seconds.")
+
+def parse_args(argv=None):
+    """Parse CLI arguments: no subcommand runs the full pipeline, or 'shard' / 'merge'."""
+    parser = argparse.ArgumentParser(description="Xylanase pipeline runner.")
+    sub = parser.add_subparsers(dest="command")
+    shard = sub.add_parser("shard", help="Run one shard of a step on this node.")
+    shard.add_argument("--step", choices=["retrieval", "features"], required=True)
+    shard.add_argument("--num-shards", type=int, required=True)
+    shard.add_argument("--shard-index", type=int, required=True)
+    shard.add_argument("--shard-dir", help="Output directory for this shard (default: results/shards/shard-XXX-of-YYY).")
+    merge = sub.add_parser("merge", help="Merge completed shards into canonical results/ files.")
+    merge.add_argument("--step", choices=["retrieval", "features"], required=True)
+    merge.add_argument("--shards-root", default=SHARDS_ROOT, help="Directory containing all shard directories.")
+    merge.add_argument("--num-shards", type=int, help="Only merge shards from a run with this many shards.")
+    args = parser.parse_args(argv)
+    if args.num_shards is not None and args.num_shards < 1:
+        parser.error(f"--num-shards must be >= 1 (got {args.num_shards})")
+    if args.command == "shard" and not 0 <= args.shard_index < args.num_shards:
+        shard.error(f"--shard-index must be in [0, {args.num_shards - 1}] (got {args.shard_index})")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "shard":
+        sharding = _load_module("sharding", os.path.join('sharding', 'sharding.py'))
+        shard_dir = args.shard_dir or os.path.join(SHARDS_ROOT, sharding.shard_dir_name(args.shard_index, args.num_shards))
+        if args.step == "retrieval":
+            run_retrieval_shard(args.num_shards, args.shard_index, shard_dir)
+        else:
+            run_feature_extraction(args.num_shards, args.shard_index, shard_dir)
+    elif args.command == "merge":
+        run_merge(args.step, args.shards_root, args.num_shards)
+        if args.step == "features":
+            run_aggregation()  # Refresh dashboard views from the merged features
+    else:
+        print(f"[PIPELINE START] Full Xylanase Pipeline — {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        run_retrieval()  # Step 1: Fetch sequences
+        run_feature_extraction()  # Step 2: Extract features
+        run_aggregation()  # Step 3: Precompute dashboard views
+        print(f"[PIPELINE DONE] All steps complete. Check 'results/' for outputs.")
@@ -8,11 +8,24 @@ from sequence_retrieval.sequence_retrieval import (
     fetch_uniprot_sequences, clean_metadata, save_outputs, fetch_entry_details
 )
 from sequence_retrieval.utils import categorize_by_temperature
+from sharding.sharding import retrieval_units, select_units, reset_shard, write_manifest
 from datetime import datetime
 import pandas as pd
 import time
 
-def process_taxon(query, taxon_name, size=200):
+# Base query components (shared; FIXED for valid syntax)
+BASE_QUERY = '(GH10 OR GH11) AND (xylanase OR "beta-xylosidase") AND reviewed:true'
+# Taxon -> root taxonomy id (FIXED: taxonomy_id, no family:)
+TAXA = {"Fungal": 4751, "Bacterial": 2}
+# Max entries kept per taxon (sharded runs apply it at merge time)
+TAXON_SIZE = 200
+# Major subtrees used to split each taxon into work units for sharded runs
+SUBTREES = {
+    "Fungal": [4890, 5204],  # Ascomycota, Basidiomycota
+    "Bacterial": [1224, 1239, 201174, 976],  # Pseudomonadota, Bacillota, Actinomycetota, Bacteroidota
+}
+
+def process_taxon(query, taxon_name, size=200, output_dir="../results"):
     """Process a single taxon: Fetch, clean, parse optima, categorize, save."""
     print(f"\n[START] Processing {taxon_name} — {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     df = fetch_uniprot_sequences(query=query, size=size, include_sequences=True)
@@ -41,25 +54,39 @@ def process_taxon(query, taxon_name, size=200):
     
     df_temp = categorize_by_temperature(df_clean)
     # Save with taxon-specific prefix
-    save_outputs(df_temp, prefix=f"{taxon_name.lower()}_xylanase_sequences")
+    save_outputs(df_temp, prefix=f"{taxon_name.lower()}_xylanase_sequences", output_dir=output_dir)
     print(f"[DONE] {taxon_name} processing completed.\n")
     return df_temp
 
-def main():
+def main(output_dir="../results"):
     print(f"\n[OVERALL START] Combined Bacterial + Fungal Retrieval — {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Base query components (shared; FIXED for valid syntax)
-    base_query = '(GH10 OR GH11) AND (xylanase OR "beta-xylosidase") AND reviewed:true'
-    
-    # Fungal query (FIXED: taxonomy_id, no family:, quoted term)
-    fungal_query = f'{base_query} AND taxonomy_id:4751'
-    process_taxon(fungal_query, "Fungal", size=200)
-    
-    # Bacterial query (FIXED: taxonomy_id:2)
-    bacterial_query = f'{base_query} AND taxonomy_id:2'
-    process_taxon(bacterial_query, "Bacterial", size=200)
+    for taxon_name, taxonomy_id in TAXA.items():
+        query = f'{BASE_QUERY} AND taxonomy_id:{taxonomy_id}'
+        process_taxon(query, taxon_name, size=TAXON_SIZE, output_dir=output_dir)
     
-    print(f"[OVERALL DONE] Pipeline completed. Check ../results/ for separate fungal/bacterial files.\n")
+    print(f"[OVERALL DONE] Pipeline completed. Check {output_dir}/ for separate fungal/bacterial files.\n")
+
+def main_shard(num_shards, shard_index, output_dir):
+    """Retrieve only this shard's taxonomy-subtree units into output_dir/retrieval/<unit_id>/.
+
+    Each unit fetches up to TAXON_SIZE entries; merge then keeps the first
+    TAXON_SIZE per taxon by accession, so the merged set is capped like main().
+    """
+    all_units = retrieval_units(TAXA, SUBTREES)
+    if num_shards > len(all_units):
+        print(f"[WARN] {num_shards} shards but only {len(all_units)} retrieval units; "
+              f"shards {len(all_units)}..{num_shards - 1} will be idle.")
+    units = select_units(all_units, num_shards, shard_index)
+    reset_shard(output_dir, "retrieval")
+    print(f"\n[SHARD START] Retrieval shard {shard_index + 1}/{num_shards}: {[u['unit_id'] for u in units]}")
+    items = {}
+    for unit in units:
+        query = f"{BASE_QUERY} AND {unit['clause']}"
+        df = process_taxon(query, unit['taxon'], size=TAXON_SIZE, output_dir=f"{output_dir}/retrieval/{unit['unit_id']}")
+        items[unit['unit_id']] = {'taxon': unit['taxon'].lower(), 'output': 0 if df is None else len(df)}
+    write_manifest(output_dir, "retrieval", num_shards, shard_index, items)
+    print(f"[SHARD DONE] Retrieval shard {shard_index + 1}/{num_shards} completed.\n")
 
 if __name__ == "__main__":
     main()
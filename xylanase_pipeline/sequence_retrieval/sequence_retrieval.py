@@ -101,12 +101,12 @@ def clean_metadata(df):
     print(f"[INFO] Cleaned dataset: {len(df)} unique sequences retained.")
     return df
 
-def save_outputs(df, prefix="xylanase_sequences"):
-    """Save metadata and FASTA files in results/ directories."""
-    os.makedirs("../results/fasta", exist_ok=True)
-    os.makedirs("../results/metadata", exist_ok=True)
-    csv_path = f"../results/metadata/{prefix}_metadata.csv"
-    fasta_path = f"../results/fasta/{prefix}.fasta"
+def save_outputs(df, prefix="xylanase_sequences", output_dir="../results"):
+    """Save metadata and FASTA files in output_dir/metadata and output_dir/fasta."""
+    os.makedirs(f"{output_dir}/fasta", exist_ok=True)
+    os.makedirs(f"{output_dir}/metadata", exist_ok=True)
+    csv_path = f"{output_dir}/metadata/{prefix}_metadata.csv"
+    fasta_path = f"{output_dir}/fasta/{prefix}.fasta"
     df.to_csv(csv_path, index=False)
     print(f"[INFO] Metadata saved to {csv_path}")
     with open(fasta_path, "w") as f:
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Sharded execution helpers: deterministic partitioning and merge
+Created on Mon Oct 19 2026
+@author: Bada Kanmi
+"""
+# xylanase_pipeline/sharding/sharding.py
+import pandas as pd
+import os
+import glob
+import json
+import shutil
+import zlib  # Stable hash (Python's hash() is salted per process)
+
+def shard_dir_name(shard_index, num_shards):
+    """Directory name for one shard, e.g. 'shard-002-of-008'."""
+    return f"shard-{shard_index:03d}-of-{num_shards:03d}"
+
+def _check_shard(shard_index, num_shards):
+    if num_shards < 1 or not 0 <= shard_index < num_shards:
+        raise ValueError(f"Invalid shard {shard_index} of {num_shards}.")
+
+def shard_for_accession(accession, num_shards):
+    """Map an accession to a shard index; identical on every node and run."""
+    return zlib.crc32(str(accession).encode('utf-8')) % num_shards
+
+def header_accession(header):
+    """Accession from a pipeline FASTA header ('Acc | Name | Org')."""
+    return header.split(' | ')[0].replace('>', '').strip()
+
+def select_sequences(sequences, num_shards, shard_index):
+    """Keep only the (header, seq) tuples whose accession hashes to this shard."""
+    _check_shard(shard_index, num_shards)
+    return [(h, s) for h, s in sequences if shard_for_accession(header_accession(h), num_shards) == shard_index]
+
+def retrieval_units(taxa, subtrees):
+    """Split each taxon into taxonomy-subtree work units.
+
+    taxa maps taxon name -> root taxonomy id; subtrees maps taxon name -> list of
+    child taxonomy ids. Each taxon yields one unit per listed subtree plus a
+    'rest' unit (root minus those subtrees), so units are disjoint and together
+    cover the root. Returns dicts with unit_id, taxon and a UniProt query clause.
+    """
+    units = []
+    for taxon, root_id in taxa.items():
+        children = subtrees.get(taxon, [])
+        for child in children:
+            units.append({
+                'unit_id': f"{taxon.lower()}-{child}",
+                'taxon': taxon,
+                'clause': f"taxonomy_id:{child}",
+            })
+        rest = f"taxonomy_id:{root_id}" + ''.join(f" NOT taxonomy_id:{child}" for child in children)
+        units.append({
+            'unit_id': f"{taxon.lower()}-rest" if children else f"{taxon.lower()}-{root_id}",
+            'taxon': taxon,
+            'clause': f"({rest})" if children else rest,
+        })
+    return units
+
+def select_units(units, num_shards, shard_index):
+    """Assign units round-robin in unit_id order and keep this shard's share."""
+    _check_shard(shard_index, num_shards)
+    ordered = sorted(units, key=lambda u: u['unit_id'])
+    return [u for i, u in enumerate(ordered) if i % num_shards == shard_index]
+
+def reset_shard(shard_dir, step):
+    """Remove a step's manifest and output subdirectory before a shard (re)starts.
+
+    A crashed or empty re-run then cannot leave older CSVs or a stale manifest
+    behind for merge to pick up.
+    """
+    manifest_path = os.path.join(shard_dir, f"manifest_{step}.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    step_dir = os.path.join(shard_dir, step)
+    if os.path.isdir(step_dir):
+        shutil.rmtree(step_dir)
+        print(f"[INFO] Cleared previous shard output in {step_dir}")
+
+def write_manifest(shard_dir, step, num_shards, shard_index, items):
+    """Record that a shard finished a step; merge refuses to run without it.
+
+    items maps a work item (taxon or retrieval unit) to its counts, e.g.
+    {'taxon': 'fungal', 'output': 40}; merge checks the shard files against them.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest_path = os.path.join(shard_dir, f"manifest_{step}.json")
+    with open(manifest_path, 'w') as f:
+        json.dump({'step': step, 'num_shards': num_shards, 'shard_index': shard_index,
+                   'items': items}, f, indent=2)
+    print(f"[INFO] Shard manifest saved to {manifest_path}")
+    return manifest_path
+
+def read_manifest(shard_dir, step):
+    """Load the manifest a shard wrote for step."""
+    with open(os.path.join(shard_dir, f"manifest_{step}.json")) as f:
+        return json.load(f)
+
+def find_shard_dirs(shards_root, step, num_shards=None):
+    """Return shard directories under shards_root, ordered by shard index.
+
+    With num_shards set, manifests from runs with a different shard count are
+    ignored. Raises if any shard of the run has not written its manifest for
+    this step, if manifests disagree on the number of shards, or if two
+    directories claim the same shard index.
+    """
+    found = []
+    for path in sorted(glob.glob(os.path.join(shards_root, '*', f"manifest_{step}.json"))):
+        with open(path) as f:
+            manifest = json.load(f)
+        if num_shards is not None and manifest['num_shards'] != num_shards:
+            print(f"[INFO] Ignoring {os.path.dirname(path)} (run with {manifest['num_shards']} shards).")
+            continue
+        found.append((manifest['shard_index'], manifest['num_shards'], os.path.dirname(path)))
+    if not found:
+        raise FileNotFoundError(f"No '{step}' shard manifests found under {shards_root}.")
+    counts = {n for _, n, _ in found}
+    if len(counts) != 1:
+        raise ValueError(f"Shard manifests under {shards_root} disagree on shard count: {sorted(counts)}.")
+    num_shards = counts.pop()
+    dirs = {}
+    for index, _, shard_dir in found:
+        if index in dirs:
+            raise ValueError(f"Shard {index} reported by both {dirs[index]} and {shard_dir}.")
+        dirs[index] = shard_dir
+    missing = sorted(set(range(num_shards)) - set(dirs))
+    if missing:
+        raise FileNotFoundError(f"Missing '{step}' output for shards {missing} of {num_shards}.")
+    return [dirs[i] for i in range(num_shards)]
+
+def shard_output_path(shard_dir, step, item, taxon):
+    """Where a shard writes the CSV for one manifest item."""
+    if step == "retrieval":
+        return os.path.join(shard_dir, 'retrieval', item, 'metadata', f"{taxon}_xylanase_sequences_metadata.csv")
+    return os.path.join(shard_dir, 'features', f"{taxon}_xylanase_features.csv")
+
+def collect_shard_outputs(shard_dirs, step, taxon):
+    """Return one taxon's shard CSVs after checking them against the manifests.
+
+    Every item's CSV must hold exactly the rows its manifest lists, and may
+    only be absent when that count is zero. For features, the shards'
+    input counts must add up to the FASTA size they all saw, so a shard that
+    read a different or missing FASTA is caught here.
+    """
+    paths = []
+    totals, inputs = set(), 0
+    for shard_dir in shard_dirs:
+        for item, counts in read_manifest(shard_dir, step)['items'].items():
+            if counts['taxon'] != taxon:
+                continue
+            path = shard_output_path(shard_dir, step, item, taxon)
+            if not os.path.exists(path):
+                if counts['output'] > 0:
+                    raise FileNotFoundError(f"Manifest lists {counts['output']} rows but {path} is missing.")
+            else:
+                rows = len(pd.read_csv(path, usecols=['Accession']))
+                if rows != counts['output']:
+                    raise ValueError(f"{path} has {rows} rows; manifest lists {counts['output']}.")
+                paths.append(path)
+            if 'fasta_total' in counts:
+                totals.add(counts['fasta_total'])
+                inputs += counts['input']
+    if len(totals) > 1:
+        raise ValueError(f"Shards read different {taxon} FASTAs (sizes {sorted(totals)}).")
+    if totals and inputs != totals.pop():
+        raise ValueError(f"Shard inputs for {taxon} add up to {inputs}, not the FASTA size.")
+    return paths
+
+def merge_tables(paths, key='Accession'):
+    """Concatenate shard CSVs, drop duplicate keys and sort by key.
+
+    Sorting by accession makes the canonical output independent of shard count
+    and of the order in which shards finished.
+    """
+    frames = [pd.read_csv(p) for p in paths]
+    frames = [df for df in frames if len(df) > 0]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    before = len(df)
+    df = df.sort_values(key, kind='mergesort').drop_duplicates(subset=[key], keep='first')
+    if before != len(df):
+        print(f"[INFO] Dropped {before - len(df)} duplicate {key} rows during merge.")
+    return df.reset_index(drop=True)